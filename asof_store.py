@@ -0,0 +1,135 @@
+# asof_store.py
+# Store append-only delle barre OHLCV scaricate da fetch_ohlcv.py (sostituisce le cartelle
+# data/<YYYY-MM-DD>/ con 500 barre copiate ogni giorno).
+# Ogni barra è salvata una volta sola con la data del dump in cui è comparsa (first_seen);
+# se un dump successivo la rivede (es. la candela del giorno, ancora parziale alle 23:05)
+# si aggiunge una nuova versione. Il manifest registra quante barre conteneva ogni dump,
+# così dump_asof() ricostruisce esattamente il vecchio data/<as_of>/<PAIR>.csv.
+import os, glob, sys
+import pandas as pd
+
+STORE_DIR = os.path.join("data", "asof")
+MANIFEST_PATH = os.path.join(STORE_DIR, "_dumps.csv")
+BAR_COLS = ["ts", "open", "high", "low", "close", "volume"]
+DUMP_COLS = BAR_COLS + ["date", "ema50", "ema200", "atr14"]
+
+def pair_key(pair):
+    # "BTC/EUR" -> "BTC_EUR" (stesso nome dei vecchi file)
+    return pair.replace("/", "_")
+
+def pair_file(pair):
+    return os.path.join(STORE_DIR, f"{pair_key(pair)}.csv")
+
+def add_indicators(df):
+    """Stessi indicatori dei dump giornalieri, calcolati sulla finestra di barre data."""
+    df = df.copy()
+    df['date'] = pd.to_datetime(df['ts'], unit='ms', utc=True).dt.tz_convert('UTC')
+    df['ema50']  = df['close'].ewm(span=50, adjust=False).mean()
+    df['ema200'] = df['close'].ewm(span=200, adjust=False).mean()
+    tr = pd.concat([
+        (df['high']-df['low']),
+        (df['high']-df['close'].shift()).abs(),
+        (df['low'] -df['close'].shift()).abs()
+    ], axis=1).max(axis=1)
+    df['atr14'] = tr.rolling(14).mean()
+    return df
+
+def _versions(pair):
+    path = pair_file(pair)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=BAR_COLS + ["first_seen"])
+    return pd.read_csv(path)
+
+def _manifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return pd.DataFrame(columns=["as_of", "pair", "n_bars"])
+    return pd.read_csv(MANIFEST_PATH)
+
+def _latest(vers, as_of):
+    # ultima versione di ogni barra vista entro as_of (le righe sono in ordine di append)
+    return vers[vers["first_seen"] <= as_of].drop_duplicates("ts", keep="last").sort_values("ts")
+
+def record(pair, as_of, bars):
+    """Registra il dump di `as_of`: aggiunge solo le barre nuove o cambiate. Ritorna le righe aggiunte."""
+    os.makedirs(STORE_DIR, exist_ok=True)
+    bars = bars[BAR_COLS].copy()
+    bars["ts"] = bars["ts"].astype("int64")
+    n_bars = len(bars)
+    vers = _versions(pair)
+    if not vers.empty:
+        old = _latest(vers, as_of)[BAR_COLS]
+        m = bars.merge(old, on="ts", how="left", suffixes=("", "_old"), indicator=True)
+        changed = m["_merge"] == "left_only"
+        for c in BAR_COLS[1:]:
+            a, b = m[c], m[f"{c}_old"]
+            changed |= a.ne(b) & ~(a.isna() & b.isna())
+        bars = bars[changed.to_numpy()]
+    new = bars.assign(first_seen=as_of)
+    path = pair_file(pair)
+    new.to_csv(path, mode="a", header=not os.path.exists(path), index=False)
+
+    man = _manifest()
+    man = man[~((man["as_of"] == as_of) & (man["pair"] == pair_key(pair)))]
+    man = pd.concat([man, pd.DataFrame([{"as_of": as_of, "pair": pair_key(pair), "n_bars": n_bars}])])
+    man.sort_values(["as_of", "pair"]).to_csv(MANIFEST_PATH, index=False)
+    return new
+
+def bars_asof(pair, as_of):
+    """Barre come apparivano nel dump di `as_of` (o nell'ultimo dump precedente)."""
+    man = _manifest()
+    man = man[(man["pair"] == pair_key(pair)) & (man["as_of"] <= as_of)]
+    if man.empty:
+        return pd.DataFrame(columns=BAR_COLS)
+    dump = man.sort_values("as_of").iloc[-1]
+    bars = _latest(_versions(pair), dump["as_of"])
+    return bars[BAR_COLS].tail(int(dump["n_bars"])).reset_index(drop=True)
+
+def dump_asof(pair, as_of):
+    """DataFrame identico al CSV che fetch_ohlcv.py scriveva in data/<as_of>/<PAIR>.csv."""
+    return add_indicators(bars_asof(pair, as_of))[DUMP_COLS]
+
+def pairs():
+    return sorted(os.path.basename(p)[:-4] for p in glob.glob(os.path.join(STORE_DIR, "*.csv"))
+                  if not os.path.basename(p).startswith("_"))
+
+def legacy_dump_dirs(root="data"):
+    return sorted(d for d in glob.glob(os.path.join(root, "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]"))
+                  if os.path.isdir(d))
+
+def migrate(root="data", remove=False):
+    """Importa le vecchie cartelle data/<YYYY-MM-DD>/ in ordine cronologico e verifica che ogni
+    CSV sia ricostruito identico; con remove=True cancella le cartelle verificate."""
+    bad = []
+    for d in legacy_dump_dirs(root):
+        as_of = os.path.basename(d)
+        ok = True
+        for p in sorted(glob.glob(os.path.join(d, "*.csv"))):
+            pair = os.path.basename(p)[:-4]
+            record(pair, as_of, pd.read_csv(p))
+            if dump_asof(pair, as_of).to_csv(index=False) != open(p).read():
+                bad.append(p)
+                ok = False
+        if ok and remove:
+            for p in glob.glob(os.path.join(d, "*.csv")):
+                os.remove(p)
+            os.rmdir(d)
+    return bad
+
+def main(argv):
+    # python asof_store.py migrate [--remove] | show <YYYY-MM-DD> <PAIR> [out.csv]
+    if argv[:1] == ["migrate"]:
+        bad = migrate(remove="--remove" in argv)
+        print(f"Migrated into {STORE_DIR}; mismatches: {len(bad)}")
+        for p in bad:
+            print("  MISMATCH", p)
+    elif argv[:1] == ["show"] and len(argv) >= 3:
+        df = dump_asof(argv[2], argv[1])
+        if len(argv) > 3:
+            df.to_csv(argv[3], index=False)
+        else:
+            print(df.tail(10).to_string(index=False))
+    else:
+        print("usage: asof_store.py migrate [--remove] | show <YYYY-MM-DD> <PAIR> [out.csv]")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])